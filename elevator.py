@@ -26,18 +26,29 @@ ON_BOARD_UP = 'on board passangers up'
 ON_BOARD_DOWN = 'on board passangers down'
 ON_BOARD_ALL = 'on board all passangers'
 
-ACTION_TIME = {
-    GO_UP: 1,
-    GO_DOWN: 1,
-    WAIT: 1,
-    ON_BOARD_UP: 2,
-    ON_BOARD_DOWN: 2,
-    ON_BOARD_ALL: 2,
-}
+# Integer action codes used by the simulation engine. Programs may return
+# either these codes or the string constants above.
+ACTION_GO_UP = 0
+ACTION_GO_DOWN = 1
+ACTION_WAIT = 2
+ACTION_ON_BOARD_UP = 3
+ACTION_ON_BOARD_DOWN = 4
+ACTION_ON_BOARD_ALL = 5
+
+# Indexed by action code.
+ACTION_NAMES = (
+    GO_UP, GO_DOWN, WAIT, ON_BOARD_UP, ON_BOARD_DOWN, ON_BOARD_ALL
+)
+ACTION_TIMES = (1, 1, 1, 2, 2, 2)
+
+# Maps both string constants and integer codes to the action code.
+ACTION_CODES = {name: code for code, name in enumerate(ACTION_NAMES)}
+ACTION_CODES.update({code: code for code in range(len(ACTION_NAMES))})
 
 
 __all__ = ('GO_UP GO_DOWN WAIT ON_BOARD_UP ON_BOARD_DOWN ON_BOARD_ALL'
-' ElevatorProgram').split(' ')
+' ACTION_GO_UP ACTION_GO_DOWN ACTION_WAIT ACTION_ON_BOARD_UP'
+' ACTION_ON_BOARD_DOWN ACTION_ON_BOARD_ALL ElevatorProgram').split(' ')
 
 class Simulation:
     def __init__(self, floors_count, program, person_generator, max_waiting):
@@ -48,9 +59,21 @@ class Simulation:
         self.step_counter = 0
         self.max_waiting = max_waiting
         self.person_generator = person_generator
+        # Indexed by action code.
+        self._handlers = (
+            self._go_up,
+            self._go_down,
+            self._wait,
+            self._on_board_up,
+            self._on_board_down,
+            self._on_board_all,
+        )
+        # Positions of elevators passed to the program, reused between steps.
+        self._elevator_floors = []
 
     def add_elevator(self, elevator):
         self.elevators.append(elevator)
+        self._elevator_floors.append(elevator.floor_number)
 
     def add_person(self, person, floor_number):
         self.floors[floor_number].add_person(person)
@@ -71,71 +94,81 @@ class Simulation:
             return -1
 
     def _remove_persons_from_elevator(self, elevator):
-        outgoing = [
-            p
-            for p in elevator.persons
-            if p.destination == elevator.floor_number
-        ]
-        for person in outgoing:
-            elevator.persons.remove(person)
-            self.transport_times.append(self.step_counter - person.born_at)
-
-    def _on_board_persons(self, elevator_id, condition, callbacks):
-        elevator = self.elevators[elevator_id]
+        # Compact the list in place to keep the order of remaining persons.
+        persons = elevator.persons
+        floor_number = elevator.floor_number
+        kept = 0
+        for person in persons:
+            if person.destination == floor_number:
+                self.transport_times.append(self.step_counter - person.born_at)
+            else:
+                persons[kept] = person
+                kept += 1
+        del persons[kept:]
+
+    def _on_board_persons(self, elevator_id, elevator, lowest, highest):
+        """On board persons heading to floors in range [lowest, highest).
+
+        Returns True if some of those persons stayed on the floor.
+        """
         floor_number = elevator.floor_number
-        floor = self.floors[floor_number]
-        persons = [p for p in floor.persons if condition(p)]
-        while elevator.free_capacity > 0 and persons:
-            person = persons.pop()
-            floor.persons.remove(person)
-            elevator.add_person(person)
-            self.program.press_button(elevator_id, person.destination)
-        if persons:
+        persons = self.floors[floor_number].persons
+        free_capacity = elevator.free_capacity
+        remaining = False
+        for i in range(len(persons) - 1, -1, -1):
+            destination = persons[i].destination
+            if (lowest <= destination < highest and
+                    destination != floor_number):
+                if free_capacity > 0:
+                    elevator.add_person(persons.pop(i))
+                    free_capacity -= 1
+                    self.program.press_button(elevator_id, destination)
+                else:
+                    remaining = True
+                    break
+        return remaining
+
+    def _go_up(self, elevator_id, elevator):
+        if elevator.floor_number + 1 < len(self.floors):
+            elevator.floor_number += 1
+            elevator.move_counter += 1
+
+    def _go_down(self, elevator_id, elevator):
+        if elevator.floor_number > 0:
+            elevator.floor_number -= 1
+            elevator.move_counter += 1
+
+    def _wait(self, elevator_id, elevator):
+        pass
+
+    def _on_board_up(self, elevator_id, elevator):
+        self._remove_persons_from_elevator(elevator)
+        floor = elevator.floor_number
+        if self._on_board_persons(
+                elevator_id, elevator, floor + 1, len(self.floors)):
             # If there are remaining persons on the floor, let
             # the elevator know that
-            for callback in callbacks:
-                callback(floor_number)
+            self.program.call_elevator_up(floor)
+
+    def _on_board_down(self, elevator_id, elevator):
+        self._remove_persons_from_elevator(elevator)
+        floor = elevator.floor_number
+        if self._on_board_persons(elevator_id, elevator, 0, floor):
+            self.program.call_elevator_down(floor)
+
+    def _on_board_all(self, elevator_id, elevator):
+        self._remove_persons_from_elevator(elevator)
+        floor = elevator.floor_number
+        if self._on_board_persons(elevator_id, elevator, 0, len(self.floors)):
+            self.program.call_elevator_up(floor)
+            self.program.call_elevator_down(floor)
 
     def _update_elevator(self, elevator_id):
         elevator = self.elevators[elevator_id]
         elevator.wait_time -= 1
         if elevator.wait_time > 0:
             return
-        state = elevator.state
-        if state == WAIT:
-            pass
-        elif state == ON_BOARD_UP:
-            self._remove_persons_from_elevator(elevator)
-            floor = elevator.floor_number
-            self._on_board_persons(
-                elevator_id,
-                lambda p: p.destination > floor,
-                [self.program.call_elevator_up]
-            )
-        elif state == ON_BOARD_DOWN:
-            self._remove_persons_from_elevator(elevator)
-            floor = elevator.floor_number
-            self._on_board_persons(
-                elevator_id,
-                lambda p: p.destination < floor,
-                [self.program.call_elevator_down]
-            )
-        elif state == ON_BOARD_ALL:
-            self._remove_persons_from_elevator(elevator)
-            floor = elevator.floor_number
-            self._on_board_persons(
-                elevator_id,
-                lambda p: p.destination != floor,
-                [self.program.call_elevator_up, self.program.call_elevator_down]
-            )
-        elif (elevator.state == GO_UP and
-              elevator.floor_number + 1 < len(self.floors)):
-            elevator.floor_number += 1
-            elevator.move_counter += 1
-        elif (elevator.state == GO_DOWN and
-              elevator.floor_number > 0):
-            elevator.floor_number -= 1
-            elevator.move_counter += 1
+        self._handlers[elevator.action_code](elevator_id, elevator)
 
     def _generate_person(self):
         src_floor, dest_floor = self.person_generator()
@@ -154,15 +187,19 @@ class Simulation:
         Generate new pasangers.
         """
         self._generate_person()
-        for elevator_id, _ in enumerate(self.elevators):
+        elevators = self.elevators
+        elevator_floors = self._elevator_floors
+        for elevator_id in range(len(elevators)):
             self._update_elevator(elevator_id)
-        actions = self.program.step(
-            [elevator.floor_number for elevator in self.elevators]
-        )
-        for elevator, action in zip(self.elevators, actions):
+            elevator_floors[elevator_id] = elevators[elevator_id].floor_number
+        actions = self.program.step(elevator_floors)
+        for elevator_id in range(min(len(elevators), len(actions))):
+            elevator = elevators[elevator_id]
             if elevator.wait_time <= 0:
-                elevator.state = action
-                elevator.wait_time = ACTION_TIME[action]
+                code = ACTION_CODES[actions[elevator_id]]
+                elevator.action_code = code
+                elevator.state = ACTION_NAMES[code]
+                elevator.wait_time = ACTION_TIMES[code]
         self.step_counter += 1
 
     def failed(self):
@@ -310,6 +347,7 @@ class Elevator:
         self.floor_number = floor_number
         self.persons = []
         self.state = WAIT
+        self.action_code = ACTION_WAIT
         self.capacity = capacity
         self.wait_time = 0
         self.move_counter = 0
@@ -457,6 +495,16 @@ def run_level(level, program_cls, debug):
     print('moves:', sim.move_counter)
 
 
+def benchmark_level(level, program_cls, steps):
+    sim, _ = load_level(level, program_cls)
+    start = time.perf_counter()
+    for _ in range(steps):
+        sim.step()
+    duration = time.perf_counter() - start
+    print('steps:', steps)
+    print('steps/sec: {:.0f}'.format(steps / duration))
+
+
 class TestSimulation(unittest.TestCase):
     def test_draw(self):
         generator = lambda: None, None
@@ -481,6 +529,60 @@ class TestSimulation(unittest.TestCase):
         ]):
             self.assertEqual(gline.rstrip('\n'), eline)
 
+    def _run_onboard(self, action):
+        calls = []
+
+        class Program(ElevatorProgram):
+            def call_elevator_up(self, floor):
+                calls.append(('up', floor))
+
+            def call_elevator_down(self, floor):
+                calls.append(('down', floor))
+
+            def press_button(self, elevator_id, destination):
+                calls.append(('press', destination))
+
+            def step(self, floors):
+                return [action] * len(floors)
+
+        sim = Simulation(4, Program(4, 1), lambda: (None, None), 10)
+        elevator = Elevator(1, 2)
+        elevator.add_person(Person(1))
+        elevator.add_person(Person(3))
+        sim.add_elevator(elevator)
+        for destination in (0, 2, 3, 0, 2):
+            sim.add_person(Person(destination), 1)
+        for _ in range(3):
+            sim.step()
+        return sim, calls
+
+    def test_on_board_up(self):
+        for action in (ON_BOARD_UP, ACTION_ON_BOARD_UP):
+            sim, calls = self._run_onboard(action)
+            elevator = sim.elevators[0]
+            self.assertEqual(elevator.state, ON_BOARD_UP)
+            self.assertEqual(sim.transport_times, [2])
+            self.assertEqual(
+                [p.destination for p in elevator.persons], [3, 2])
+            self.assertEqual(
+                [p.destination for p in sim.floors[1].persons], [0, 2, 3, 0])
+            self.assertEqual(calls, [('press', 2), ('up', 1)])
+
+    def test_on_board_all(self):
+        sim, calls = self._run_onboard(ON_BOARD_ALL)
+        self.assertEqual(
+            [p.destination for p in sim.floors[1].persons], [0, 2, 3, 0])
+        self.assertEqual(calls, [('press', 2), ('up', 1), ('down', 1)])
+
+    def test_move(self):
+        sim = Simulation(2, ElevatorProgram(2, 1), lambda: (None, None), 10)
+        sim.add_elevator(Elevator(0))
+        sim.program.step = lambda floors: [ACTION_GO_UP]
+        for _ in range(3):
+            sim.step()
+        self.assertEqual(sim.elevators[0].floor_number, 1)
+        self.assertEqual(sim.move_counter, 1)
+
 
 def main():
     parser = argparse.ArgumentParser('run elevator simulator')
@@ -491,12 +593,17 @@ def main():
     parser.add_argument(
         '--debug', help='show detailed output', default=False,
         action='store_true')
+    parser.add_argument(
+        '--benchmark', help='measure simulation speed for given number of'
+        ' steps', default=0, type=int)
     args = parser.parse_args()
     if args.program:
         program = importlib.import_module(args.program).Program
     else:
         program = ElevatorProgram
-    if args.level > 0:
+    if args.level > 0 and args.benchmark > 0:
+        benchmark_level(args.level, program, args.benchmark)
+    elif args.level > 0:
         run_level(args.level, program, args.debug)
     else:
         unittest.main()